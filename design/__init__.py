@@ -3,9 +3,13 @@ from .augmented_block import augmented_block
 from .cr import cr
 from .factorial import factorial_2
 from .gls import greaco_latin_square
+from .latin_hypercube import latin_hypercube
 from .latin_square import latin_square
 from .lattice import lattice
+from .optimal import optimal_design
+from .prep import prep
 from .rcb import rcb
+from .row_column import row_column
 from .split import split
 from .strip import strip
 from .youden import youden
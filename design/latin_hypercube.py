@@ -0,0 +1,170 @@
+""" Generate Space-Filling Latin Hypercube Designs """
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+_CRITERIA = ['maximin', 'phi_p']
+
+
+def latin_hypercube(n, k, criterion='maximin', p=50, iterations=None,
+                    restarts=1, n_jobs=None, seed=None):
+    """ Generate an n run Latin Hypercube Design in k factors
+
+    A Latin Hypercube design splits the range of each factor into `n` equal
+    intervals and samples each interval exactly once, so every column of the
+    design is a permutation of the `n` levels.
+
+    Each restart begins with independent random permutations for every column
+    and improves the Morris-Mitchell :math:`\\phi_p` criterion,
+    :math:`(\\sum_{i<j} d_{ij}^{-p})^{1/p}`, by swapping two levels within a
+    column.  A swap only changes the distances from the two swapped runs to
+    every other run, so a maintained distance matrix lets the change in the
+    criterion be evaluated in O(n) rather than O(n^2).  For large `p` the
+    :math:`\\phi_p` criterion orders designs like the maximin criterion, which
+    is why it is also used as the search objective for `criterion='maximin'`.
+
+    Args:
+        n: The number of runs.
+        k: The number of factors.
+        criterion: Either 'maximin' or 'phi_p'.  Selects the value reported
+            for the design and used to pick the best restart.
+        p: The exponent of the :math:`\\phi_p` criterion.
+        iterations: The number of swaps attempted per restart.  Defaults to
+            `20 * n * k`.
+        restarts: The number of random restarts.
+        n_jobs: The number of processes the restarts are spread over.  If this
+            value is None or 1, the restarts are run in this process.
+        seed: The seed for used by numpy.random.seed()
+
+    Raises:
+        ValueError: If `n` or `k` is not an integer of at least 2 (1 for `k`),
+            if `criterion` is unknown, if `p` is not positive or if
+            `restarts` is less than 1.
+
+    Returns:
+        ndarray: The n by k design matrix with values at the centres of the
+            intervals of [0, 1].
+        float: The achieved criterion value, the minimum distance between
+            runs for 'maximin' (larger is better) or :math:`\\phi_p` for
+            'phi_p' (smaller is better).
+    """
+    if not isinstance(n, int) or n < 2:
+        raise ValueError('`n` ({}) must be an integer of at '
+                         'least 2.'.format(n))
+    if not isinstance(k, int) or k < 1:
+        raise ValueError('`k` ({}) must be a positive integer.'.format(k))
+    if criterion not in _CRITERIA:
+        raise ValueError('`criterion` ({}) must be one of {}'.format(
+            criterion, _CRITERIA))
+    if p <= 0:
+        raise ValueError('`p` ({}) must be positive.'.format(p))
+    if not isinstance(restarts, int) or restarts < 1:
+        raise ValueError('`restarts` ({}) must be a positive '
+                         'integer.'.format(restarts))
+    if iterations is None:
+        iterations = 20 * n * k
+
+    if seed is not None:
+        np.random.seed(seed)
+    seeds = np.random.randint(0, 2**31 - 1, size=restarts)
+    args = [(n, k, p, iterations, s) for s in seeds]
+
+    if n_jobs is None or n_jobs == 1:
+        results = [_optimize_restart(a) for a in args]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            chunksize = max(1, restarts // (4 * n_jobs))
+            results = list(pool.map(_optimize_restart, args,
+                                    chunksize=chunksize))
+
+    values = []
+    for levels in results:
+        sq_dist = _squared_distances(levels)
+        if criterion == 'maximin':
+            values.append(-_min_distance(sq_dist))
+        else:
+            values.append(_phi_p(sq_dist, p))
+    best = int(np.argmin(values))
+
+    # Criterion values are computed on the integer levels; rescale to [0, 1]
+    if criterion == 'maximin':
+        value = -values[best] / n
+    else:
+        value = values[best] * n
+    design_matrix = (results[best] + 0.5) / n
+    return design_matrix, value
+
+
+def _optimize_restart(args):
+    """ Runs a single restart of the column-wise swap search
+
+    Args:
+        args: A tuple of the number of runs, the number of factors, the
+            exponent of the criterion, the number of iterations and the seed.
+
+    Returns:
+        ndarray: The n by k matrix of integer levels in [0, n).
+    """
+    n, k, p, iterations, seed = args
+    rng = np.random.RandomState(seed)
+    levels = np.array([rng.permutation(n) for _ in range(k)],
+                      dtype=float).T
+
+    # Distances are kept on the integer levels, so every distance is at least
+    # sqrt(k) and d ** -p cannot overflow.
+    sq_dist = _squared_distances(levels)
+    np.fill_diagonal(sq_dist, np.inf)
+    power = sq_dist ** (-p / 2.0)
+
+    cols = rng.randint(0, k, size=iterations)
+    rows = rng.randint(0, n, size=(iterations, 2))
+    for c, (i, j) in zip(cols, rows):
+        if i == j:
+            continue
+        col = levels[:, c]
+        delta = (col[j] - col) ** 2 - (col[i] - col) ** 2
+        new_i = sq_dist[i] + delta
+        new_j = sq_dist[j] - delta
+        # The distance between runs i and j does not change with the swap
+        new_i[j] = sq_dist[i, j]
+        new_j[i] = sq_dist[j, i]
+        new_i[i] = new_j[j] = np.inf
+
+        power_i = new_i ** (-p / 2.0)
+        power_j = new_j ** (-p / 2.0)
+        change = (power_i.sum() + power_j.sum()
+                  - power[i].sum() - power[j].sum())
+        if change < 0:
+            col[i], col[j] = col[j], col[i]
+            sq_dist[i, :] = sq_dist[:, i] = new_i
+            sq_dist[j, :] = sq_dist[:, j] = new_j
+            power[i, :] = power[:, i] = power_i
+            power[j, :] = power[:, j] = power_j
+
+    return levels
+
+
+def _squared_distances(design_matrix):
+    """ Computes the squared Euclidean distances between the runs
+
+    Args:
+        design_matrix: the numpy array whose rows are the runs
+
+    Returns:
+        ndarray: The n by n matrix of squared distances
+    """
+    norms = (design_matrix ** 2).sum(axis=1)
+    sq_dist = norms[:, np.newaxis] + norms[np.newaxis, :] \
+        - 2 * design_matrix.dot(design_matrix.T)
+    return np.maximum(sq_dist, 0)
+
+
+def _min_distance(sq_dist):
+    """ Returns the smallest distance between two distinct runs """
+    upper = np.triu_indices(sq_dist.shape[0], 1)
+    return float(np.sqrt(sq_dist[upper].min()))
+
+
+def _phi_p(sq_dist, p):
+    """ Returns the Morris-Mitchell phi_p criterion of the distances """
+    upper = np.triu_indices(sq_dist.shape[0], 1)
+    return float((sq_dist[upper] ** (-p / 2.0)).sum() ** (1.0 / p))
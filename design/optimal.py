@@ -0,0 +1,292 @@
+""" Generate D- and I-Optimal Exact Designs """
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+import numpy as np
+
+_CRITERIA = ['D', 'I']
+_MAX_TRIES = 100
+_MOMENT_POINTS = 20000
+
+
+def optimal_design(factors, n, interactions=None, criterion='D',
+                   constraint=None, starts=1, max_passes=20, n_jobs=None,
+                   seed=None):
+    """ Generate an n run D- or I-Optimal Design by Coordinate Exchange
+
+    The model has an intercept, a main effect for every factor and a column
+    for each of `interactions`, which, like the contrasts of `factorial_2`,
+    is the product of the listed factor columns.
+
+    Each start is a random design that is improved by coordinate exchange:
+    every factor of every run is set in turn to the level that improves the
+    criterion most, until a pass over the design makes no change.  Changing
+    a run from x to y changes the information matrix X'X by yy' - xx', so
+    the criterion for every candidate level is evaluated from the current
+    inverse with Sherman-Morrison updates in O(p^2) for p model terms, and
+    the inverse itself is updated the same way when a change is made.
+
+    Args:
+        factors: A list with, for each factor, the list of its numeric levels.
+            For example, [[-1, 1], [-1, 0, 1]] for a two level and a three
+            level factor.
+        n: The number of runs.
+        interactions: (optional) A list of lists of factor numbers, starting
+            at 1, giving the interactions in the model.  For example,
+            [[1, 2], [1, 3]] adds the x_1 x_2 and x_1 x_3 interactions.
+        criterion: 'D' to maximize det(X'X) or 'I' to minimize the average
+            prediction variance over the grid of factor levels.  With a
+            `constraint`, the average is over the grid points inside the
+            design region, or over a random sample of them when the grid
+            is large.
+        constraint: (optional) A function taking a run (an array with the
+            level of each factor) and returning False if the run is outside
+            the design region.  It must be picklable if `n_jobs` > 1.
+        starts: The number of random starts.
+        max_passes: The largest number of passes over the design per start.
+        n_jobs: The number of processes the starts are spread over.  If this
+            value is None or 1, the starts are run in this process.
+        seed: The seed for used by numpy.random.seed()
+
+    Raises:
+        ValueError: If `criterion` is unknown, if `starts` is not a positive
+            integer, if an interaction refers to a factor that does not
+            exist or lists a factor more than once, if `n` is not an integer
+            or is smaller than the number of model terms or if no
+            non-singular starting design can be found.
+
+    Returns:
+        ndarray: The design matrix whose columns are the run number and the
+            level of each factor.
+        float: The D-efficiency, det(X'X)^(1/p) / n, for 'D' or the average
+            prediction variance for 'I'.
+    """
+    if criterion not in _CRITERIA:
+        raise ValueError('`criterion` ({}) must be one of {}'.format(
+            criterion, _CRITERIA))
+    if not isinstance(starts, int) or starts < 1:
+        raise ValueError('`starts` ({}) must be a positive '
+                         'integer.'.format(starts))
+    k = len(factors)
+    terms = [[]] + [[j] for j in range(k)]
+    for interaction in interactions or []:
+        if any(not 1 <= j <= k for j in interaction):
+            raise ValueError('Interaction {} refers to a factor not in '
+                             '1..{}'.format(interaction, k))
+        if len(set(interaction)) != len(interaction):
+            raise ValueError('Interaction {} lists a factor more than '
+                             'once'.format(interaction))
+        terms.append([j - 1 for j in interaction])
+    p = len(terms)
+    if not isinstance(n, int):
+        raise ValueError('`n` ({}) must be an integer.'.format(n))
+    if n < p:
+        raise ValueError('`n` ({}) must be at least the number of model '
+                         'terms ({})'.format(n, p))
+
+    # Pad every term to the same order with the index of a constant column
+    order = max(len(term) for term in terms)
+    term_index = np.array([term + [k] * (order - len(term))
+                           for term in terms])
+    factors = [np.array(levels, dtype=float) for levels in factors]
+
+    if seed is not None:
+        np.random.seed(seed)
+    if criterion == 'I' and constraint is None:
+        moments = _moments(factors, term_index)
+    elif criterion == 'I':
+        moments = _region_moments(factors, term_index, constraint)
+    else:
+        moments = None
+    seeds = np.random.randint(0, 2**31 - 1, size=starts)
+    args = [(factors, n, term_index, moments, constraint, max_passes, s)
+            for s in seeds]
+
+    if n_jobs is None or n_jobs == 1:
+        results = [_exchange_start(a) for a in args]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            results = list(pool.map(_exchange_start, args))
+
+    values = []
+    for runs in results:
+        if runs is None:
+            values.append(np.inf)
+            continue
+        information = _expand(runs, term_index)
+        information = information.T.dot(information)
+        if criterion == 'D':
+            sign, log_det = np.linalg.slogdet(information)
+            values.append(-log_det if sign > 0 else np.inf)
+        else:
+            values.append(np.trace(moments.dot(np.linalg.inv(information))))
+    best = int(np.argmin(values))
+    if not np.isfinite(values[best]):
+        raise ValueError('No non-singular starting design was found; try '
+                         'more runs or a smaller model')
+
+    if criterion == 'D':
+        value = np.exp(-values[best] / p) / n
+    else:
+        value = values[best]
+
+    ids = np.array(list(range(1, n + 1)))
+    design_matrix = np.c_[ids, results[best]]
+    return design_matrix, value
+
+
+def _expand(runs, term_index):
+    """ Builds the model matrix of `runs`
+
+    Args:
+        runs: An array whose rows are runs and columns are factor levels.
+        term_index: A p by order array with, for each model term, the factors
+            multiplied together.  The index k refers to a column of ones.
+
+    Returns:
+        ndarray: The model matrix with one column per term.
+    """
+    augmented = np.c_[runs, np.ones(runs.shape[0])]
+    return augmented[:, term_index].prod(axis=2)
+
+
+def _moments(factors, term_index):
+    """ Returns the moment matrix of the model over the grid of levels
+
+    Every term is a product of distinct factors, so with the factors
+    independent and uniform on their levels, the entry for terms a and b is
+    the product over factors of the mean of level ** (power in a + power in
+    b).
+    """
+    k = len(factors)
+    powers = np.zeros((term_index.shape[0], k), dtype=int)
+    for term, factors_in_term in enumerate(term_index):
+        for j in factors_in_term:
+            if j < k:
+                powers[term, j] += 1
+
+    p = powers.shape[0]
+    moments = np.ones((p, p))
+    for j, levels in enumerate(factors):
+        means = np.array([np.mean(levels ** e) for e in range(3)])
+        moments *= means[powers[:, j][:, np.newaxis] + powers[:, j]]
+    return moments
+
+
+def _region_moments(factors, term_index, constraint):
+    """ Returns the moment matrix of the model over the design region
+
+    The grid of levels is enumerated when it has at most _MOMENT_POINTS
+    points, otherwise _MOMENT_POINTS points are drawn from it at random.
+    Only the points satisfying `constraint` are kept.
+
+    Raises:
+        ValueError: If none of the points satisfy `constraint`.
+    """
+    size = np.prod([float(len(levels)) for levels in factors])
+    if size <= _MOMENT_POINTS:
+        points = np.array(list(product(*factors)))
+    else:
+        points = np.array([levels[np.random.randint(len(levels),
+                                                    size=_MOMENT_POINTS)]
+                           for levels in factors]).T
+    points = points[[bool(constraint(point)) for point in points]]
+    if points.shape[0] == 0:
+        raise ValueError('No point of the grid of levels satisfies the '
+                         'constraint')
+    model = _expand(points, term_index)
+    return model.T.dot(model) / points.shape[0]
+
+
+def _random_runs(factors, n, constraint, rng):
+    """ Draws n random runs satisfying `constraint` """
+    runs = np.zeros((n, len(factors)))
+    for i in range(n):
+        for _ in range(_MAX_TRIES):
+            run = np.array([levels[rng.randint(len(levels))]
+                            for levels in factors])
+            if constraint is None or constraint(run):
+                break
+        else:
+            raise ValueError('No run satisfying the constraint was found in '
+                             '{} random draws'.format(_MAX_TRIES))
+        runs[i] = run
+    return runs
+
+
+def _exchange_start(args):
+    """ Runs a single start of coordinate exchange
+
+    Args:
+        args: A tuple of the factor levels, the number of runs, the term
+            index, the moment matrix (None for the D-criterion), the
+            constraint, the largest number of passes and the seed.
+
+    Returns:
+        ndarray: The n by k array of runs, or None if no non-singular
+            starting design was found.
+    """
+    factors, n, term_index, moments, constraint, max_passes, seed = args
+    rng = np.random.RandomState(seed)
+    p = term_index.shape[0]
+
+    for _ in range(_MAX_TRIES):
+        runs = _random_runs(factors, n, constraint, rng)
+        model = _expand(runs, term_index)
+        if np.linalg.matrix_rank(model) == p:
+            break
+    else:
+        return None
+
+    # A change must multiply the determinant by more than one (D) or reduce
+    # the average variance (I)
+    threshold = -1 - 1e-9 if moments is None else -1e-12
+    for _ in range(max_passes):
+        # Refresh the inverse each pass so round-off does not accumulate
+        inverse = np.linalg.inv(model.T.dot(model))
+        changed = False
+        for i in range(n):
+            for j in rng.permutation(len(factors)):
+                candidates = np.repeat(runs[i:i + 1], len(factors[j]), axis=0)
+                candidates[:, j] = factors[j]
+                if constraint is not None:
+                    keep = [constraint(run) for run in candidates]
+                    candidates = candidates[keep]
+                x = model[i]
+                y = _expand(candidates, term_index)
+
+                # Removing x and adding y: by the matrix determinant lemma the
+                # determinant is multiplied by (1 - d(x))(1 + d(y)) + d(x, y)^2
+                bx = inverse.dot(x)
+                by = y.dot(inverse)
+                d_x = x.dot(bx)
+                d_y = (by * y).sum(axis=1)
+                d_xy = by.dot(x)
+                den_x = (1 - d_x) * (1 + d_y) + d_xy ** 2
+                if moments is None:
+                    score = -den_x
+                else:
+                    # Add y, then remove x, each by Sherman-Morrison
+                    b1x = bx - by * (d_xy / (1 + d_y))[:, np.newaxis]
+                    d1_x = d_x - d_xy ** 2 / (1 + d_y)
+                    with np.errstate(divide='ignore', invalid='ignore'):
+                        score = (-(by.dot(moments) * by).sum(axis=1)
+                                 / (1 + d_y)
+                                 + (b1x.dot(moments) * b1x).sum(axis=1)
+                                 / (1 - d1_x))
+                    score[den_x <= 1e-10] = np.inf
+                best = int(np.argmin(score))
+                if den_x[best] <= 1e-10 or score[best] >= threshold:
+                    continue
+
+                y = y[best]
+                by = by[best]
+                inverse -= np.outer(by, by) / (1 + d_y[best])
+                b1x = inverse.dot(x)
+                inverse += np.outer(b1x, b1x) / (1 - x.dot(b1x))
+                runs[i] = candidates[best]
+                model[i] = y
+                changed = True
+        if not changed:
+            break
+
+    return runs
@@ -0,0 +1,216 @@
+""" Generate a Spatially Optimized Partially Replicated Design """
+import math
+import numpy as np
+
+
+def prep(treatments_1, treatments_2, rows, cols, reps, radius=2,
+         iterations=None, seed=None):
+    """ Generate a Partially Replicated (p-rep) Design on a Field Grid
+
+    This is the spatial counterpart of `augmented_block`.  Checks and
+    partially replicated entries from `treatment_1` are run `reps` times and
+    the entries in `treatment_2` are run once, but rather than being assigned
+    to blocks the plots are laid out on a `rows` by `cols` grid.
+
+    The layout starts from a random arrangement and is improved by simulated
+    annealing over swaps of two plots.  The criterion penalises
+
+    * copies of the same treatment within `radius` plots of each other,
+      weighted by the inverse squared distance between them, and
+    * copies of the same treatment sharing a row or a column,
+
+    so that replicated treatments are spread across the field and do not
+    neighbour themselves.  Both terms are local, so each swap only
+    re-evaluates the neighbourhoods of the two plots involved.
+
+    Args:
+        treatment_1: A list of treatments to be replicated, i.e. the checks
+            and the partially replicated entries
+        treatment_2: A list of treatments to be run in single plots
+        rows: The number of rows in the field
+        cols: The number of columns in the field
+        reps: The number of reps each treatment from treatment_1 is run.
+            Either an integer or a list with one value per treatment.
+        radius: The distance, in plots, within which copies of the same
+            treatment are penalised
+        iterations: The number of swaps attempted.  Defaults to 20 times the
+            number of plots.
+        seed: The seed for used by numpy.random.seed()
+
+    Raises:
+        ValueError: If `reps` is not a positive integer or a list of them
+            with one value per treatment, or if the number of plots does not
+            equal `rows * cols`.
+
+    Returns:
+        ndarray: The design matrix whose columns are the row, the column and
+            the treatment, sorted by row and column.
+    """
+    if seed is not None:
+        np.random.seed(seed)
+
+    n_trt_1 = len(treatments_1)
+    if isinstance(reps, int):
+        reps = [reps] * n_trt_1
+    if len(reps) != n_trt_1 or any(not isinstance(r, int) or r < 1
+                                   for r in reps):
+        raise ValueError('`reps` must be a positive integer or a list of '
+                         '{} positive integers'.format(n_trt_1))
+
+    n_plots = sum(reps) + len(treatments_2)
+    if n_plots != rows * cols:
+        raise ValueError('The design has {} plots but the field has {} '
+                         '({} rows by {} columns)'.format(
+                             n_plots, rows * cols, rows, cols))
+    if iterations is None:
+        iterations = 20 * n_plots
+
+    # Replicated treatments are numbered first so that `trt < n_trt_1`
+    # identifies them
+    labels = list(treatments_1) + list(treatments_2)
+    grid = []
+    for trt, r in enumerate(reps):
+        grid.extend([trt] * r)
+    grid.extend(range(n_trt_1, len(labels)))
+    grid = [int(trt) for trt in np.random.permutation(grid)]
+
+    grid = _anneal(grid, rows, cols, n_trt_1, radius, iterations)
+
+    row = [plot // cols + 1 for plot in range(n_plots)]
+    col = [plot % cols + 1 for plot in range(n_plots)]
+    treatment = [labels[trt] for trt in grid]
+    design_matrix = np.transpose(np.array([row, col, treatment]))
+    return design_matrix
+
+
+def _neighbours(rows, cols, radius):
+    """ Lists the plots within `radius` of each plot
+
+    Args:
+        rows: The number of rows in the field
+        cols: The number of columns in the field
+        radius: The largest row or column offset of a neighbour
+
+    Returns:
+        list: For each plot, a list of (plot, weight) tuples where the weight
+            is the inverse squared distance to the neighbour.
+    """
+    offsets = []
+    for dr in range(-radius, radius + 1):
+        for dc in range(-radius, radius + 1):
+            if (dr or dc) and dr * dr + dc * dc <= radius * radius:
+                offsets.append((dr, dc, 1.0 / (dr * dr + dc * dc)))
+
+    neighbours = []
+    for r in range(rows):
+        for c in range(cols):
+            neighbours.append([((r + dr) * cols + c + dc, w)
+                               for dr, dc, w in offsets
+                               if 0 <= r + dr < rows and 0 <= c + dc < cols])
+    return neighbours
+
+
+def _anneal(grid, rows, cols, n_rep, radius, iterations):
+    """ Improves a layout by simulated annealing over swaps of two plots
+
+    Args:
+        grid: A list with the treatment number of each plot, row by row
+        rows: The number of rows in the field
+        cols: The number of columns in the field
+        n_rep: The number of replicated treatments.  Treatments numbered
+            below this are replicated.
+        radius: The distance within which copies are penalised
+        iterations: The number of swaps attempted
+
+    Returns:
+        list: The improved layout
+    """
+    n_plots = rows * cols
+    neighbours = _neighbours(rows, cols, radius)
+
+    # Only plots holding replicated treatments contribute to the criterion,
+    # so one plot of each swap is drawn from them.
+    rep_plots = [plot for plot in range(n_plots) if grid[plot] < n_rep]
+    slot = [-1] * n_plots
+    for idx, plot in enumerate(rep_plots):
+        slot[plot] = idx
+    if not rep_plots:
+        return grid
+
+    row_count = [[0] * rows for _ in range(n_rep)]
+    col_count = [[0] * cols for _ in range(n_rep)]
+    for plot in rep_plots:
+        row_count[grid[plot]][plot // cols] += 1
+        col_count[grid[plot]][plot % cols] += 1
+
+    def line_change(trt, src, dst):
+        """ Change in the row and column penalty of moving trt """
+        if trt >= n_rep:
+            return 0
+        change = 0
+        src_r, src_c = divmod(src, cols)
+        dst_r, dst_c = divmod(dst, cols)
+        if src_r != dst_r:
+            change += row_count[trt][dst_r] - row_count[trt][src_r] + 1
+        if src_c != dst_c:
+            change += col_count[trt][dst_c] - col_count[trt][src_c] + 1
+        return change
+
+    def line_move(trt, src, dst):
+        if trt < n_rep:
+            row_count[trt][src // cols] -= 1
+            col_count[trt][src % cols] -= 1
+            row_count[trt][dst // cols] += 1
+            col_count[trt][dst % cols] += 1
+
+    # Geometric cooling from a temperature at which a unit penalty is
+    # usually accepted to one at which it almost never is
+    t_start, t_end = 1.0, 0.01
+    cooling = (t_end / t_start) ** (1.0 / max(iterations, 1))
+    temperature = t_start
+    picks = np.random.randint(0, len(rep_plots), size=iterations)
+    others = np.random.randint(0, n_plots, size=iterations)
+    uniforms = np.random.random(size=iterations)
+
+    for it in range(iterations):
+        temperature *= cooling
+        slot_a = int(picks[it])
+        a = rep_plots[slot_a]
+        b = int(others[it])
+        t_a = grid[a]
+        t_b = grid[b]
+        if t_a == t_b:
+            continue
+
+        # The pair (a, b) holds different treatments before and after the
+        # swap, so it is excluded from the new neighbourhood sums.
+        change = 0.0
+        for q, w in neighbours[a]:
+            g = grid[q]
+            if g == t_a:
+                change -= w
+            elif g == t_b and q != b:
+                change += w
+        for q, w in neighbours[b]:
+            g = grid[q]
+            if g == t_b:
+                change -= w
+            elif g == t_a and q != a:
+                change += w
+        change += line_change(t_a, a, b) + line_change(t_b, b, a)
+
+        if change <= 0 or uniforms[it] < math.exp(-change / temperature):
+            line_move(t_a, a, b)
+            line_move(t_b, b, a)
+            grid[a] = t_b
+            grid[b] = t_a
+            if t_b < n_rep:
+                slot_b = slot[b]
+                rep_plots[slot_b] = a
+                slot[a] = slot_b
+            else:
+                slot[a] = -1
+            rep_plots[slot_a] = b
+            slot[b] = slot_a
+
+    return grid
@@ -0,0 +1,277 @@
+""" Generate an Optimized Resolvable Row-Column Design """
+import numpy as np
+
+_REFRESH = 500
+_MAX_TRIES = 100
+
+
+def row_column(treatments, rows, cols, neighbour_weight=0.05,
+               iterations=None, seed=None):
+    """ Generate a Resolvable Row-Column Design for a rows by cols Field
+
+    Each replicate is a band of whole rows (or, failing that, whole columns)
+    that contains every treatment once.  The design starts from a random
+    permutation of the treatments in each replicate and is improved by an
+    interchange search that swaps two plots within a replicate, so the
+    design stays resolvable.
+
+    The search minimises
+
+        trace(C^+) + neighbour_weight * (repeated neighbour pairs)
+
+    where C is the treatment information matrix after eliminating rows and
+    columns, and the second term counts how often a pair of treatments is
+    adjacent (horizontally or vertically) more than once.  Since the field
+    is a complete rows by cols grid, a swap changes C by a symmetric
+    rank-two matrix, so the change in trace(C^+) is computed from two
+    Sherman-Morrison updates of the inverse in O(v^2) instead of
+    re-inverting C.
+
+    Args:
+        treatments: A list of the v treatments to be used in the design
+        rows: The number of rows in the field
+        cols: The number of columns in the field
+        neighbour_weight: The weight of the neighbour balance penalty.  With
+            0 only the A-criterion is optimized.
+        iterations: The number of swaps attempted.  Defaults to 50 times the
+            number of plots.
+        seed: The seed for used by numpy.random.seed()
+
+    Raises:
+        ValueError: If the field cannot be split into at least two
+            replicates of whole rows or whole columns that each hold every
+            treatment once, or if no connected layout is found.
+
+    Returns:
+        ndarray: The design matrix whose columns are the replicate, the row,
+            the column and the treatment, sorted by row and column.
+        float: The A-efficiency of the design, the average variance of an
+            elementary treatment contrast in a completely randomized design
+            with the same replication divided by that in this design.
+    """
+    if seed is not None:
+        np.random.seed(seed)
+
+    v = len(treatments)
+    n_plots = rows * cols
+    if v < 2 or n_plots % v != 0:
+        raise ValueError('The number of plots ({}) must be a multiple of the '
+                         'number of treatments ({})'.format(n_plots, v))
+    reps = n_plots // v
+    if reps < 2:
+        raise ValueError('The field must hold at least two replicates of '
+                         'the {} treatments'.format(v))
+    if rows % reps == 0:
+        rep = [plot // cols // (rows // reps) for plot in range(n_plots)]
+    elif cols % reps == 0:
+        rep = [plot % cols // (cols // reps) for plot in range(n_plots)]
+    else:
+        raise ValueError('{} replicates cannot be formed from whole rows or '
+                         'whole columns of a {} by {} field'.format(
+                             reps, rows, cols))
+    if iterations is None:
+        iterations = 50 * n_plots
+
+    grid = [0] * n_plots
+    rep_plots = [[] for _ in range(reps)]
+    for plot, r in enumerate(rep):
+        rep_plots[r].append(plot)
+
+    # The search needs a connected start, so that C + J / v is invertible.
+    # Random starts are drawn first, then a cyclic start is tried.
+    for _ in range(_MAX_TRIES):
+        for plots in rep_plots:
+            for plot, trt in zip(plots, np.random.permutation(v)):
+                grid[plot] = int(trt)
+        if _connected(grid, rows, cols, v):
+            break
+    else:
+        for r, plots in enumerate(rep_plots):
+            for idx, plot in enumerate(plots):
+                grid[plot] = (idx + r) % v
+        if not _connected(grid, rows, cols, v):
+            raise ValueError('No connected resolvable layout of {} treatments '
+                             'was found for a {} by {} field'.format(
+                                 v, rows, cols))
+
+    grid = _interchange(grid, rep_plots, rows, cols, v, neighbour_weight,
+                        iterations)
+    if not _connected(grid, rows, cols, v):
+        raise ValueError('The optimized layout is not connected')
+
+    trace = np.trace(np.linalg.inv(_information(grid, rows, cols, v))) - 1
+    efficiency = (v - 1) / (reps * trace)
+
+    row = [plot // cols + 1 for plot in range(n_plots)]
+    col = [plot % cols + 1 for plot in range(n_plots)]
+    treatment = [treatments[trt] for trt in grid]
+    design_matrix = np.transpose(np.array([[r + 1 for r in rep], row, col,
+                                           treatment]))
+    return design_matrix, efficiency
+
+
+def _incidence(grid, rows, cols, v):
+    """ Returns the treatment by row and treatment by column incidences """
+    layout = np.array(grid).reshape(rows, cols)
+    n_row = np.zeros((v, rows))
+    n_col = np.zeros((v, cols))
+    for r in range(rows):
+        np.add.at(n_row[:, r], layout[r, :], 1)
+    for c in range(cols):
+        np.add.at(n_col[:, c], layout[:, c], 1)
+    return n_row, n_col
+
+
+def _information(grid, rows, cols, v):
+    """ Returns C + J / v for the treatment information matrix C
+
+    Rows and columns of a complete grid are orthogonal, so eliminating both
+    gives C = diag(r) - N_r N_r' / cols - N_c N_c' / rows + r r' / n.  Adding
+    J / v makes the matrix invertible for a connected design, and its inverse
+    is C^+ + J / v.
+    """
+    n_row, n_col = _incidence(grid, rows, cols, v)
+    replication = n_row.sum(axis=1)
+    information = (np.diag(replication)
+                   - n_row.dot(n_row.T) / cols
+                   - n_col.dot(n_col.T) / rows
+                   + np.outer(replication, replication) / (rows * cols))
+    return information + np.ones((v, v)) / v
+
+
+def _connected(grid, rows, cols, v):
+    """ Returns True if every treatment contrast is estimable """
+    information = _information(grid, rows, cols, v)
+    return np.linalg.matrix_rank(information) == v
+
+
+def _edges(plot, rows, cols):
+    """ Lists the plots horizontally or vertically adjacent to `plot` """
+    r, c = divmod(plot, cols)
+    edges = []
+    if r > 0:
+        edges.append(plot - cols)
+    if r < rows - 1:
+        edges.append(plot + cols)
+    if c > 0:
+        edges.append(plot - 1)
+    if c < cols - 1:
+        edges.append(plot + 1)
+    return edges
+
+
+def _pair(t_1, t_2):
+    return (t_1, t_2) if t_1 < t_2 else (t_2, t_1)
+
+
+def _interchange(grid, rep_plots, rows, cols, v, neighbour_weight,
+                 iterations):
+    """ Improves a design by interchanging plots within replicates
+
+    Args:
+        grid: A list with the treatment number of each plot, row by row
+        rep_plots: A list with the plots of each replicate
+        rows: The number of rows in the field
+        cols: The number of columns in the field
+        v: The number of treatments
+        neighbour_weight: The weight of the neighbour balance penalty
+        iterations: The number of swaps attempted
+
+    Returns:
+        list: The improved design
+    """
+    n_row, n_col = _incidence(grid, rows, cols, v)
+    inverse = np.linalg.inv(_information(grid, rows, cols, v))
+    edges = [_edges(plot, rows, cols) for plot in range(rows * cols)]
+
+    neighbours = {}
+    for plot in range(rows * cols):
+        for other in edges[plot]:
+            if other > plot:
+                key = _pair(grid[plot], grid[other])
+                neighbours[key] = neighbours.get(key, 0) + 1
+
+    def move_pairs(plots, sign):
+        """ Adds or removes the pairs touching `plots`, returning the
+        change in the number of repeated pairs """
+        change = 0
+        seen = set()
+        for plot in plots:
+            for other in edges[plot]:
+                edge = _pair(plot, other)
+                if edge in seen:
+                    continue
+                seen.add(edge)
+                key = _pair(grid[plot], grid[other])
+                count = neighbours.get(key, 0)
+                change += count if sign > 0 else 1 - count
+                neighbours[key] = count + sign
+        return change
+
+    accepted = 0
+    reps = len(rep_plots)
+    picks = np.random.randint(0, reps, size=iterations)
+    pairs = np.random.randint(0, v, size=(iterations, 2))
+    for it in range(iterations):
+        plots = rep_plots[picks[it]]
+        p = plots[pairs[it, 0]]
+        q = plots[pairs[it, 1]]
+        t_p = grid[p]
+        t_q = grid[q]
+        if t_p == t_q:
+            continue
+        r_p, c_p = divmod(p, cols)
+        r_q, c_q = divmod(q, cols)
+
+        # Moving t_q into (r_p, c_p) and t_p into (r_q, c_q) changes C by
+        # -(d z' + z d') = -(z + d)(z + d)' / 2 + (z - d)(z - d)' / 2
+        d = np.zeros(v)
+        d[t_q] = 1
+        d[t_p] = -1
+        z = np.zeros(v)
+        if r_p != r_q:
+            z += (n_row[:, r_p] - n_row[:, r_q] + d) / cols
+        if c_p != c_q:
+            z += (n_col[:, c_p] - n_col[:, c_q] + d) / rows
+        x_1 = (z + d) / np.sqrt(2)
+        x_2 = (z - d) / np.sqrt(2)
+
+        bx_1 = inverse.dot(x_1)
+        den_1 = 1 - x_1.dot(bx_1)
+        if den_1 <= 1e-10:
+            # The swap would disconnect the design
+            continue
+        bx_2 = inverse.dot(x_2)
+        bx_2 += bx_1 * (bx_1.dot(x_2) / den_1)
+        den_2 = 1 + x_2.dot(bx_2)
+        change = bx_1.dot(bx_1) / den_1 - bx_2.dot(bx_2) / den_2
+
+        if neighbour_weight:
+            penalty = move_pairs((p, q), -1)
+            grid[p], grid[q] = t_q, t_p
+            penalty += move_pairs((p, q), 1)
+            change += neighbour_weight * penalty
+
+        if change < -1e-12:
+            if not neighbour_weight:
+                grid[p], grid[q] = t_q, t_p
+            inverse += np.outer(bx_1, bx_1) / den_1
+            inverse -= np.outer(bx_2, bx_2) / den_2
+            n_row[t_p, r_p] -= 1
+            n_row[t_q, r_p] += 1
+            n_row[t_q, r_q] -= 1
+            n_row[t_p, r_q] += 1
+            n_col[t_p, c_p] -= 1
+            n_col[t_q, c_p] += 1
+            n_col[t_q, c_q] -= 1
+            n_col[t_p, c_q] += 1
+            accepted += 1
+            if accepted % _REFRESH == 0:
+                # Guard against round-off accumulating in the updates
+                inverse = np.linalg.inv(_information(grid, rows, cols, v))
+        elif neighbour_weight:
+            move_pairs((p, q), -1)
+            grid[p], grid[q] = t_p, t_q
+            move_pairs((p, q), 1)
+
+    return grid
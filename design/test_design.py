@@ -1,6 +1,7 @@
 """ Test Cases for Design module
 """
 
+import numpy as np
 import pytest
 import design as d
 
@@ -8,3 +9,129 @@ import design as d
 def test_unroll():
     """ Test cases for _unroll """
     pass
+
+
+def test_latin_hypercube():
+    """ Test cases for latin_hypercube """
+    design_matrix, value = d.latin_hypercube(20, 3, restarts=2, seed=7)
+    assert design_matrix.shape == (20, 3)
+    for col in range(3):
+        levels = sorted(design_matrix[:, col] * 20 - 0.5)
+        assert levels == pytest.approx(list(range(20)))
+
+    sq_dist = ((design_matrix[:, None, :] - design_matrix[None, :, :]) ** 2)
+    sq_dist = sq_dist.sum(axis=2) + 10 * np.eye(20)
+    assert value == pytest.approx(np.sqrt(sq_dist.min()))
+
+    repeat, _ = d.latin_hypercube(20, 3, restarts=2, n_jobs=2, seed=7)
+    assert (repeat == design_matrix).all()
+
+    _, start = d.latin_hypercube(20, 3, iterations=0, seed=7)
+    assert value >= start
+
+    with pytest.raises(ValueError):
+        d.latin_hypercube(20, 3, criterion='unknown')
+    with pytest.raises(ValueError):
+        d.latin_hypercube(20, 3, criterion='phi_p', p=0)
+
+
+def test_prep():
+    """ Test cases for prep """
+    checks = ['C1', 'C2']
+    entries = ['E{}'.format(i) for i in range(20)]
+    design_matrix = d.prep(checks, entries, 4, 7, [4, 4], seed=11)
+    assert design_matrix.shape == (28, 3)
+    treatments = list(design_matrix[:, 2])
+    assert treatments.count('C1') == 4
+    assert treatments.count('C2') == 4
+    assert sorted(set(treatments) - set(checks)) == sorted(entries)
+
+    # Copies of a check should not neighbour each other
+    grid = design_matrix[:, 2].reshape(4, 7)
+    for check in checks:
+        for r, c in zip(*np.where(grid == check)):
+            assert grid[r, min(c + 1, 6)] != check or c == 6
+            assert grid[min(r + 1, 3), c] != check or r == 3
+
+    repeat = d.prep(checks, entries, 4, 7, [4, 4], seed=11)
+    assert (repeat == design_matrix).all()
+
+    with pytest.raises(ValueError):
+        d.prep(checks, entries, 5, 5, 4)
+
+
+def test_row_column():
+    """ Test cases for row_column """
+    treatments = list(range(12))
+    design_matrix, efficiency = d.row_column(treatments, 6, 8, seed=5)
+    assert design_matrix.shape == (48, 4)
+    for rep in range(1, 5):
+        in_rep = design_matrix[design_matrix[:, 0] == rep]
+        assert sorted(in_rep[:, 3]) == treatments
+
+    _, start = d.row_column(treatments, 6, 8, iterations=0, seed=5)
+    _, best = d.row_column(treatments, 6, 8, neighbour_weight=0, seed=5)
+    assert start < best <= 1
+
+    # With two rows, a random start is often disconnected
+    for seed in range(5):
+        _, efficiency = d.row_column(list(range(20)), 2, 20, seed=seed)
+        assert 0 < efficiency <= 1
+    _, efficiency = d.row_column(list('abcd'), 2, 4, seed=1)
+    assert 0 < efficiency <= 1
+
+    with pytest.raises(ValueError):
+        d.row_column(treatments, 5, 5)
+    # Single plot rows absorb every treatment contrast
+    with pytest.raises(ValueError):
+        d.row_column([1, 2], 4, 1)
+
+
+def test_optimal_design():
+    """ Test cases for optimal_design """
+    factors = [[-1, 1]] * 3
+    interactions = [[1, 2], [1, 3], [2, 3]]
+    design_matrix, efficiency = d.optimal_design(
+        factors, 8, interactions=interactions, starts=5, seed=2)
+    assert design_matrix.shape == (8, 4)
+    assert efficiency == pytest.approx(1)
+    assert len(set(map(tuple, design_matrix[:, 1:]))) == 8
+
+    _, variance = d.optimal_design(factors, 8, interactions=interactions,
+                                   criterion='I', starts=5, seed=2)
+    assert variance == pytest.approx(7 / 8)
+
+    def constraint(run):
+        return run[0] + run[1] <= 1
+
+    design_matrix, _ = d.optimal_design([[-1, 0, 1]] * 2, 8,
+                                        interactions=[[1, 2]],
+                                        constraint=constraint, seed=2)
+    assert all(constraint(run) for run in design_matrix[:, 1:])
+
+    # The I-criterion averages over the feasible points only
+    design_matrix, variance = d.optimal_design(
+        [[-1, 0, 1]] * 2, 8, interactions=[[1, 2]], criterion='I',
+        constraint=constraint, seed=2)
+    assert all(constraint(run) for run in design_matrix[:, 1:])
+
+    def model(runs):
+        return np.c_[np.ones(len(runs)), runs, runs[:, 0] * runs[:, 1]]
+
+    grid = np.array([[a, b] for a in [-1, 0, 1] for b in [-1, 0, 1]
+                     if constraint([a, b])])
+    moments = model(grid).T.dot(model(grid)) / len(grid)
+    x = model(design_matrix[:, 1:])
+    expected = np.trace(moments.dot(np.linalg.inv(x.T.dot(x))))
+    assert variance == pytest.approx(expected)
+
+    with pytest.raises(ValueError):
+        d.optimal_design(factors, 3)
+    with pytest.raises(ValueError):
+        d.optimal_design(factors, 8, interactions=[[1, 4]])
+    with pytest.raises(ValueError):
+        d.optimal_design(factors, 8, interactions=[[1, 1, 1]], criterion='I')
+    with pytest.raises(ValueError):
+        d.optimal_design(factors, 8, starts=0)
+    with pytest.raises(ValueError):
+        d.optimal_design(factors, 8.0)